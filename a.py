@@ -1,11 +1,17 @@
 import os
 import csv
 import json
-from typing import List, Tuple, Dict, Set
+from operator import itemgetter
+from typing import List, Tuple, Dict, Set, Iterator, Optional
 
 import mysql.connector
 from dotenv import load_dotenv
 
+try:
+    import ijson  # incremental parser: advisor rows are decoded one at a time
+except ImportError:
+    ijson = None
+
 load_dotenv()
 
 JSON_FILE = os.getenv("SRC_JSON", "app.json")
@@ -21,6 +27,8 @@ MYSQL_CFG = {
 PRINT_LIMIT = 25
 # Whether to export full mismatch lists to CSV files
 WRITE_CSV = True
+# Rows per executemany() when loading JSON pairs into the temp table
+TEMP_BATCH = 2000
 
 # JSON field aliases -> canonical keys (advisor uses lowercase in your DDL)
 ALIASES: Dict[str, List[str]] = {
@@ -34,52 +42,149 @@ def norm(v) -> str:
         return ""
     return str(v).strip()
 
-def get_json_advisors(path: str) -> Set[Tuple[str, str]]:
+def iter_json_advisor_rows(path: str) -> Iterator[dict]:
+    """Yield raw `advisor` rows, streaming them with ijson when it is installed."""
+    done = 0
+    if ijson is not None:
+        try:
+            with open(path, "rb") as f:
+                for row in ijson.items(f, "advisor.item", use_float=True):
+                    yield row
+                    done += 1
+            return
+        except ijson.IncompleteJSONError:
+            # the C backend overflows on integers >= 2**63 anywhere in the
+            # file; json.load does not, so re-read it whole and resume
+            pass
+
     with open(path, "r", encoding="utf-8") as f:
         doc = json.load(f)
+    if isinstance(doc, dict) and isinstance(doc.get("advisor"), list):
+        yield from doc["advisor"][done:]
 
-    if not isinstance(doc, dict) or "advisor" not in doc or not isinstance(doc["advisor"], list):
-        print("[WARN] JSON file has no 'advisor' list; returning empty set.")
-        return set()
+def resolve_key(row: dict, canonical: str) -> Optional[str]:
+    """First alias of `canonical` present in row, or None."""
+    for k in ALIASES[canonical]:
+        if k in row:
+            return k
+    return None
 
+def get_json_advisors(path: str) -> Set[Tuple[str, str]]:
     out: Set[Tuple[str, str]] = set()
-    for row in doc["advisor"]:
+    add = out.add
+    # Rows share one key layout in practice: resolve aliases once and read
+    # both ids with a C-level itemgetter; rows that lack those keys, or that
+    # carry a higher-priority alias (`shadow`), take the slow path.
+    pick, shadow = None, ()
+    for row in iter_json_advisor_rows(path):
         if not isinstance(row, dict):
             continue
-        # Resolve instructor id
-        i_val = None
-        for k in ALIASES["i_id"]:
-            if k in row:
-                i_val = row[k]; break
-        # Resolve student id
-        s_val = None
-        for k in ALIASES["s_id"]:
-            if k in row:
-                s_val = row[k]; break
-        out.add((norm(i_val), norm(s_val)))
+        if pick is not None and not any(k in row for k in shadow):
+            try:
+                i_val, s_val = pick(row)
+            except KeyError:
+                pass
+            else:
+                add((norm(i_val), norm(s_val)))
+                continue
+        # Resolve instructor / student id
+        i_key = resolve_key(row, "i_id")
+        s_key = resolve_key(row, "s_id")
+        if pick is None and i_key and s_key:
+            pick = itemgetter(i_key, s_key)
+            shadow = (ALIASES["i_id"][:ALIASES["i_id"].index(i_key)]
+                      + ALIASES["s_id"][:ALIASES["s_id"].index(s_key)])
+        i_val = row[i_key] if i_key else None
+        s_val = row[s_key] if s_key else None
+        add((norm(i_val), norm(s_val)))
+
+    if not out:
+        print("[WARN] JSON file has no 'advisor' rows; returning empty set.")
     return out
 
-def get_mysql_advisors(cfg: dict) -> Set[Tuple[str, str]]:
+def advisor_key_columns(cur) -> Dict[str, Tuple[str, int]]:
+    """(charset, max chars) of advisor's i_id / s_id, read from information_schema."""
+    cur.execute(
+        "SELECT LOWER(COLUMN_NAME), CHARACTER_SET_NAME, CHARACTER_MAXIMUM_LENGTH"
+        " FROM information_schema.COLUMNS"
+        " WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'advisor'"
+        " AND LOWER(COLUMN_NAME) IN ('i_id', 's_id')"
+    )
+    cols = {name: (charset, width) for (name, charset, width) in cur}
+    # Column info unavailable: fall back to utf8mb4 and a generous width
+    return {c: (cols[c][0], int(cols[c][1])) if c in cols and cols[c][0] else ("utf8mb4", 255)
+            for c in ("i_id", "s_id")}
+
+def diff_against_mysql(cfg: dict, json_set: Set[Tuple[str, str]]) -> Tuple[int, int, List[Tuple[str, str]], List[Tuple[str, str]]]:
+    """
+    Load the JSON pairs into a session TEMPORARY table and let MySQL compute
+    both sides of the difference with LEFT JOINs on the advisor PK, so only
+    the mismatching pairs cross the wire.
+    Returns (mysql_row_count, in_both, only_in_json, only_in_mysql).
+    """
     conn = mysql.connector.connect(**cfg)
     cur = conn.cursor()
+    cols = advisor_key_columns(cur)
+    (i_cs, i_len), (s_cs, s_len) = cols["i_id"], cols["s_id"]
+    # Same charset as advisor, but its _bin collation: pairs compare exactly
+    # (case-sensitive), as the Python set difference did, so case variants
+    # neither collide on the temp PK nor match each other in the joins.
+    i_coll, s_coll = f"{i_cs}_bin", f"{s_cs}_bin"
+    # Dropped automatically when the session closes
+    cur.execute(
+        "CREATE TEMPORARY TABLE `_json_advisor` ("
+        f" i_id VARCHAR({i_len}) CHARACTER SET {i_cs} COLLATE {i_coll} NOT NULL,"
+        f" s_id VARCHAR({s_len}) CHARACTER SET {s_cs} COLLATE {s_coll} NOT NULL,"
+        " PRIMARY KEY (i_id, s_id)) ENGINE=MEMORY"
+    )
+    # Ids wider than advisor's columns cannot be in advisor: they are
+    # JSON-only as-is and would only fail the insert in strict mode
+    pairs, too_long = [], []
+    for t in json_set:
+        (too_long if len(t[0]) > i_len or len(t[1]) > s_len else pairs).append(t)
+    for i in range(0, len(pairs), TEMP_BATCH):
+        cur.executemany("INSERT INTO `_json_advisor` (i_id, s_id) VALUES (%s, %s)", pairs[i:i+TEMP_BATCH])
+
+    # advisor ids are compared as norm() leaves them: trimmed, exact (_bin)
+    a_i = f"TRIM(a.i_id) COLLATE {i_coll}"
+    a_s = f"TRIM(a.s_id) COLLATE {s_coll}"
+
+    # distinct normalized pairs, as the old Python set counted them
+    cur.execute(f"SELECT COUNT(DISTINCT {a_i}, {a_s}) FROM `advisor` a")
+    mysql_rows = int(cur.fetchone()[0])
+
+    # Diff rows arrive already sorted and are normalized straight off the
+    # cursor, so no fetchall() copy or client-side sort is needed.
     # Your DDL uses lowercase column names i_id, s_id
-    cur.execute("SELECT i_id, s_id FROM `advisor` ORDER BY i_id, s_id")
-    res = {(norm(i), norm(s)) for (i, s) in cur.fetchall()}
+    cur.execute(
+        "SELECT j.i_id, j.s_id FROM `_json_advisor` j"
+        f" LEFT JOIN `advisor` a ON {a_i} = j.i_id AND {a_s} = j.s_id"
+        " WHERE a.i_id IS NULL ORDER BY j.i_id, j.s_id"
+    )
+    only_in_json = [(norm(i), norm(s)) for (i, s) in cur]
+    # |A & B| == |A| - |A - B| over the pairs that were actually loaded
+    in_both = len(pairs) - len(only_in_json)
+    if too_long:
+        only_in_json = sorted(only_in_json + too_long)
+
+    cur.execute(
+        f"SELECT DISTINCT {a_i}, {a_s} FROM `advisor` a"
+        f" LEFT JOIN `_json_advisor` j ON j.i_id = {a_i} AND j.s_id = {a_s}"
+        " WHERE j.i_id IS NULL ORDER BY 1, 2"
+    )
+    only_in_mysql = [(norm(i), norm(s)) for (i, s) in cur]
+
     cur.close()
     conn.close()
-    return res
+    return mysql_rows, in_both, only_in_json, only_in_mysql
 
 def main():
     json_set = get_json_advisors(JSON_FILE)
-    mysql_set = get_mysql_advisors(MYSQL_CFG)
-
-    only_in_json  = sorted(list(json_set - mysql_set))
-    only_in_mysql = sorted(list(mysql_set - json_set))
-    in_both       = len(json_set & mysql_set)
+    mysql_rows, in_both, only_in_json, only_in_mysql = diff_against_mysql(MYSQL_CFG, json_set)
 
     print("\n=== Advisor PK Comparison ===")
     print(f"JSON rows      : {len(json_set)}")
-    print(f"MySQL rows     : {len(mysql_set)}")
+    print(f"MySQL rows     : {mysql_rows}")
     print(f"Intersection   : {in_both}")
     print(f"JSON-only rows : {len(only_in_json)}")
     print(f"MySQL-only rows: {len(only_in_mysql)}")
@@ -4,15 +4,26 @@ import os
 import json
 import binascii
 import hashlib
-from typing import Dict, List, Tuple, Iterable
+from typing import Dict, List, Tuple, Iterable, Optional
 
 from dotenv import load_dotenv
 import mysql.connector
 
+try:
+    import ijson  # incremental parser: collections are decoded without building the whole doc
+except ImportError:
+    ijson = None
+try:
+    import orjson  # fast whole-document parser
+except ImportError:
+    orjson = None
+
 # ----------------- CONFIG -----------------
 load_dotenv()
 
 JSON_FILE = os.getenv("SRC_JSON", "app.json")
+# Files larger than this are stream-parsed (ijson); smaller ones are parsed whole (orjson)
+JSON_STREAM_MIN_BYTES = int(os.getenv("JSON_STREAM_MIN_BYTES", str(256 * 1024 * 1024)))
 
 MYSQL_CFG = {
     "host": os.getenv("DB_HOST", "127.0.0.1"),
@@ -68,14 +79,41 @@ FK_MAP: List[Tuple[Tuple[str, Tuple[str, ...]], Tuple[str, Tuple[str, ...]]]] =
 ANOMALY_LIMIT = 20
 SAMPLE_LIMIT = 10
 MYSQL_BATCH = 2000
+HASH_CHUNK = 1 << 20  # bytes of key text per hashlib.update()
 
 STUDENT_PRESERVE = {"ID", "dept_name"}
 INSTR_PRESERVE   = {"ID", "dept_name"}
 
 # ----------------- LOAD JSON -----------------
+def _first_token(f) -> bytes:
+    """Peek the first non-whitespace byte of a binary file, then rewind."""
+    while True:
+        c = f.read(1)
+        if not c or not c.isspace():
+            f.seek(0)
+            return c
+
 def load_json_collections(path: str) -> Dict[str, List[dict]]:
-    with open(path, "r", encoding="utf-8") as f:
-        doc = json.load(f)
+    if ijson is not None and (orjson is None or os.path.getsize(path) > JSON_STREAM_MIN_BYTES):
+        try:
+            with open(path, "rb") as f:
+                first = _first_token(f)
+                if first == b"{":
+                    # stream top-level members; non-list values are dropped as soon as they are parsed
+                    return {k: v for k, v in ijson.kvitems(f, "", use_float=True) if isinstance(v, list)}
+                if first == b"[":
+                    return {"root": list(ijson.items(f, "item", use_float=True))}
+            raise ValueError("Unsupported JSON top-level structure.")
+        except ijson.IncompleteJSONError:
+            # the C backend overflows on integers >= 2**63; load the whole document instead
+            pass
+
+    if orjson is not None:
+        with open(path, "rb") as f:
+            doc = orjson.loads(f.read())
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            doc = json.load(f)
     if isinstance(doc, dict):
         # expected shape: {"student":[...], "instructor":[...], ...}
         return {k: v for k, v in doc.items() if isinstance(v, list)}
@@ -87,17 +125,38 @@ def load_json_collections(path: str) -> Dict[str, List[dict]]:
 # ----------------- MYSQL -----------------
 mysql = mysql.connector.connect(**MYSQL_CFG)
 cur = mysql.cursor()
+# let server-side GROUP_CONCAT checksums grow up to the packet limit (default is 1 KB)
+cur.execute("SET SESSION group_concat_max_len = @@global.max_allowed_packet")
+
+def mysql_counts(tables: List[str]) -> Dict[str, int]:
+    """Row counts for all tables in one round-trip: one scalar subquery per table."""
+    cur.execute("SELECT " + ", ".join("(SELECT COUNT(1) FROM `{}`)".format(t) for t in tables))
+    return {t: int(n) for t, n in zip(tables, cur.fetchone())}
 
-def mysql_count(table: str) -> int:
-    cur.execute("SELECT COUNT(1) FROM `{}`".format(table))
-    return int(cur.fetchone()[0])
+# table -> column names in ordinal order, filled by one information_schema query
+COLS_BY_TABLE: Dict[str, List[str]] = {}
+
+def load_mysql_columns() -> Dict[str, List[str]]:
+    cur.execute(
+        "SELECT TABLE_NAME, COLUMN_NAME FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA = DATABASE() ORDER BY TABLE_NAME, ORDINAL_POSITION"
+    )
+    out: Dict[str, List[str]] = {}
+    for t, c in cur.fetchall():
+        out.setdefault(t, []).append(c)
+    return out
 
 def get_mysql_columns(table: str) -> List[str]:
-    cur2 = mysql.cursor()
-    cur2.execute("SHOW COLUMNS FROM `{}`".format(table))
-    cols = [r[0] for r in cur2.fetchall()]
-    cur2.close()
-    return cols
+    # the schema does not change while the check runs (do not mutate the result)
+    if not COLS_BY_TABLE:
+        COLS_BY_TABLE.update(load_mysql_columns())
+    if table not in COLS_BY_TABLE:
+        # not listed (e.g. name case differs): ask the server directly
+        cur2 = mysql.cursor()
+        cur2.execute("SHOW COLUMNS FROM `{}`".format(table))
+        COLS_BY_TABLE[table] = [r[0] for r in cur2.fetchall()]
+        cur2.close()
+    return COLS_BY_TABLE[table]
 
 def mysql_rows_iter(table: str, pk_cols: Tuple[str, ...]) -> Iterable[Tuple[List[str], Tuple]]:
     """
@@ -154,19 +213,60 @@ def mysql_select_cols_iter(table: str, cols: List[str], order_by: Tuple[str, ...
 def _to_str(v):
     return "" if v is None else str(v)
 
-def checksum_json_by_pk(rows: List[dict], pk_cols: Tuple[str, ...]) -> str:
-    # Sort by PK tuple for deterministic order
-    def keyf(r):
-        return tuple(_to_str(r.get(k)) for k in pk_cols)
+def sha256_lines(lines: Iterable[str]) -> str:
+    """
+    SHA-256 over "<line>\\n" for every line. Lines are joined and hashed in
+    ~HASH_CHUNK-sized buffers instead of one hashlib call per row.
+    """
     h = hashlib.sha256()
-    for r in sorted(rows, key=keyf):
-        key = "|".join(_to_str(r.get(k)) for k in pk_cols)
-        h.update((key + "\n").encode("utf-8"))
+    buf: List[str] = []
+    size = 0
+    for line in lines:
+        buf.append(line)
+        size += len(line) + 1
+        if size >= HASH_CHUNK:
+            h.update(("\n".join(buf) + "\n").encode("utf-8"))
+            buf, size = [], 0
+    if buf:
+        h.update(("\n".join(buf) + "\n").encode("utf-8"))
     return h.hexdigest()
 
+def checksum_json_by_pk(rows: List[dict], pk_cols: Tuple[str, ...]) -> str:
+    # Sort the PK tuples themselves for deterministic order: each row's key is
+    # built once and sorted in C, with no per-row key callback
+    keys = sorted(tuple(_to_str(r.get(k)) for k in pk_cols) for r in rows)
+    return sha256_lines("|".join(key) for key in keys)
+
+def checksum_mysql_server_side(table: str, pk_cols: Tuple[str, ...]) -> Optional[str]:
+    """
+    Same digest as the streaming path, computed in-engine: PK values joined
+    by '|', one line per row in PK order, hashed with SHA2(..., 256).
+    Only the digest crosses the wire. Returns None if GROUP_CONCAT output
+    would be truncated by group_concat_max_len.
+    """
+    key = "CONCAT_WS('|', {})".format(", ".join("COALESCE(`{}`, '')".format(c) for c in pk_cols))
+    order = ", ".join("`{}`".format(c) for c in pk_cols)
+    sql = """
+    SELECT SHA2(CONVERT(g USING utf8mb4), 256), LENGTH(g), expected
+    FROM (
+        SELECT GROUP_CONCAT(CONCAT({key}, '\\n') ORDER BY {order} SEPARATOR '') AS g,
+               SUM(LENGTH({key}) + 1) AS expected
+        FROM `{table}`
+    ) x
+    """.format(key=key, order=order, table=table)
+    cur.execute(sql)
+    digest, got_len, expected_len = cur.fetchone()
+    if expected_len is None:
+        # empty table: hash of no input
+        return hashlib.sha256().hexdigest()
+    if int(got_len) != int(expected_len):
+        return None
+    return digest
+
 def checksum_mysql_by_pk(table: str, pk_cols: Tuple[str, ...]) -> str:
     """
     SHA-256 over canonical strings of (existing) PK tuple values.
+    Computed server-side when possible; otherwise rows are streamed.
     Warns and uses subset if some PK columns are missing.
     Falls back to hashing full rows if none of the PK columns exist.
     """
@@ -178,15 +278,19 @@ def checksum_mysql_by_pk(table: str, pk_cols: Tuple[str, ...]) -> str:
         print("[WARN] `{}`: missing PK columns {}. Using subset {} for checksum."
               .format(table, missing, effective_pk if effective_pk else "(none)"))
 
-    h = hashlib.sha256()
-    for cols, row in mysql_rows_iter(table, effective_pk):
-        if effective_pk:
-            key = "|".join(_to_str(row[cols.index(k)]) for k in effective_pk)
-        else:
-            # last resort: hash all columns in row order
-            key = "|".join(_to_str(v) for v in row)
-        h.update((key + "\n").encode("utf-8"))
-    return h.hexdigest()
+    if effective_pk:
+        digest = checksum_mysql_server_side(table, effective_pk)
+        if digest is not None:
+            return digest
+        print("[WARN] `{}`: key list exceeds group_concat_max_len; streaming rows for checksum.".format(table))
+
+    if effective_pk:
+        # fetch only the PK columns, already in key order
+        rows = mysql_select_cols_iter(table, list(effective_pk), effective_pk)
+    else:
+        # last resort: hash all columns in row order
+        rows = (row for _, row in mysql_rows_iter(table, effective_pk))
+    return sha256_lines("|".join(_to_str(v) for v in row) for row in rows)
 
 # ----------------- REPORTING -----------------
 def print_header(title: str):
@@ -213,19 +317,27 @@ def show_top10_takes(json_rows: List[dict]):
                 _to_str(r.get("semester")), int(r.get("year") or 0))
     jrows = sorted(json_rows, key=k)[:SAMPLE_LIMIT]
 
-    for doc in jrows:
-        key_vals = [doc.get("ID"), doc.get("course_id"), doc.get("sec_id"), doc.get("semester")]
-        where = "ID=%s AND course_id=%s AND sec_id=%s AND semester=%s"
-        params = key_vals.copy()
-
-        # add year predicate if we detected a column
-        if year_col:
-            where += " AND `{}`=%s".format(year_col)
-            params.append(doc.get("year"))
-
-        sql = "SELECT grade_ct, grade_iv FROM `takes` WHERE " + where + " LIMIT 1"
-        cur.execute(sql, tuple(params))
-        r = cur.fetchone()
+    # fetch all sampled rows in one round-trip: one LIMIT 1 lookup per sample,
+    # glued with UNION ALL and tagged with the sample's position, so MySQL
+    # matches keys under its own rules (collation, INT vs string)
+    where = "ID=%s AND course_id=%s AND sec_id=%s AND semester=%s"
+    key_fields = ["ID", "course_id", "sec_id", "semester"]
+    # add year predicate if we detected a column
+    if year_col:
+        where += " AND `{}`=%s".format(year_col)
+        key_fields.append("year")
+
+    found = {}
+    if jrows:
+        sql = " UNION ALL ".join(
+            "(SELECT {} AS idx, grade_ct, grade_iv FROM `takes` WHERE {} LIMIT 1)".format(i, where)
+            for i in range(len(jrows)))
+        cur.execute(sql, tuple(doc.get(f) for doc in jrows for f in key_fields))
+        for idx, grade_ct, grade_iv in cur.fetchall():
+            found[idx] = (grade_ct, grade_iv)
+
+    for i, doc in enumerate(jrows):
+        r = found.get(i)
 
         key_display = (doc.get("ID"), doc.get("course_id"), doc.get("sec_id"),
                        doc.get("semester"), doc.get("year"))
@@ -241,24 +353,26 @@ def show_top10_person(table: str, json_rows: List[dict], preserve_keys: set):
     print_header("TOP 10: {} (JSON plaintext vs MySQL encrypted)".format(table))
     jrows = sorted(json_rows, key=lambda r: _to_str(r.get("ID")))[:SAMPLE_LIMIT]
     # discover encrypted columns: *_ct/*_iv
-    cur2 = mysql.cursor()
-    cur2.execute("SHOW COLUMNS FROM `{}`".format(table))
-    cols = [r[0] for r in cur2.fetchall()]
-    cur2.close()
+    cols = get_mysql_columns(table)
     enc_fields = sorted({c[:-3] for c in cols if c.endswith("_ct") and c[:-3] not in preserve_keys})
 
-    for doc in jrows:
+    # fetch all sampled rows in one round-trip: per-sample LIMIT 1 lookups tagged by position
+    found = {}
+    if jrows:
+        sql = " UNION ALL ".join(
+            "(SELECT {} AS idx, t.* FROM `{}` t WHERE t.ID=%s LIMIT 1)".format(i, table)
+            for i in range(len(jrows)))
+        cur.execute(sql, tuple(doc.get("ID") for doc in jrows))
+        mcols = [d[0] for d in cur.description][1:]
+        for row in cur.fetchall():
+            found[row[0]] = dict(zip(mcols, row[1:]))
+
+    for i, doc in enumerate(jrows):
         idv = doc.get("ID")
-        cur.execute("SELECT * FROM `{}` WHERE ID=%s".format(table), (idv,))
-        row = cur.fetchone()
-        if not row:
+        row_map = found.get(i)
+        if not row_map:
             print("- ID={} | MYSQL: row not found!".format(idv))
             continue
-        cur3 = mysql.cursor()
-        cur3.execute("SHOW COLUMNS FROM `{}`".format(table))
-        mcols = [r[0] for r in cur3.fetchall()]
-        cur3.close()
-        row_map = dict(zip(mcols, row))
 
         preview = []
         # show a few encrypted fields to keep output short
@@ -286,7 +400,12 @@ def find_pk_duplicates(table: str, pk_cols: Tuple[str, ...]) -> List[Tuple]:
     cur.execute(sql)
     return cur.fetchall()
 
-def fk_orphans(child: str, child_cols: Tuple[str, ...], parent: str, parent_cols: Tuple[str, ...]) -> List[Tuple]:
+def fk_orphan_probe(child: str, child_cols: Tuple[str, ...], parent: str,
+                    parent_cols: Tuple[str, ...]) -> Optional[Tuple[List[str], str]]:
+    """
+    Orphan probe for one FK as (child column expressions, FROM ... LIMIT tail),
+    or None if the FK cannot be checked.
+    """
     child_db_cols = set(get_mysql_columns(child))
     parent_db_cols = set(get_mysql_columns(parent))
 
@@ -299,23 +418,44 @@ def fk_orphans(child: str, child_cols: Tuple[str, ...], parent: str, parent_cols
 
     if not c_eff or not p_eff or len(c_eff) != len(p_eff):
         print("[WARN] FK `{}` -> `{}`: skipped (no usable column pairing)".format(child, parent))
-        return []
+        return None
 
     on = " AND ".join("C.`{}` = P.`{}`".format(cc, pc) for cc, pc in zip(c_eff, p_eff))
-    sel_child = ", ".join("C.`{}`".format(c) for c in c_eff)
     notnull = " OR ".join("C.`{}` IS NOT NULL".format(c) for c in c_eff)
     parentnull = " OR ".join("P.`{}` IS NULL".format(pc) for pc in p_eff)
 
-    sql = """
-    SELECT {sel}
-    FROM `{child}` C
-    LEFT JOIN `{parent}` P ON {on}
-    WHERE ({notnull}) AND ({parentnull})
-    LIMIT {lim}
-    """.format(sel=sel_child, child=child, parent=parent, on=on,
-               notnull=notnull, parentnull=parentnull, lim=ANOMALY_LIMIT)
-    cur.execute(sql)
-    return cur.fetchall()
+    tail = """
+        FROM `{child}` C
+        LEFT JOIN `{parent}` P ON {on}
+        WHERE ({notnull}) AND ({parentnull})
+        LIMIT {lim}""".format(child=child, parent=parent, on=on,
+                              notnull=notnull, parentnull=parentnull, lim=ANOMALY_LIMIT)
+    return ["C.`{}`".format(c) for c in c_eff], tail
+
+def fk_orphans_all(fk_map) -> List[List[Tuple]]:
+    """
+    Run every FK orphan probe in one UNION ALL round-trip. Each branch is
+    tagged with its FK_MAP index and padded with NULLs to the widest key.
+    Returns the orphan tuples per FK_MAP entry ([] for skipped FKs).
+    """
+    probes = [fk_orphan_probe(child, child_cols, parent, parent_cols)
+              for (child, child_cols), (parent, parent_cols) in fk_map]
+    results: List[List[Tuple]] = [[] for _ in probes]
+    live = [(i, p) for i, p in enumerate(probes) if p]
+    if not live:
+        return results
+
+    width = max(len(cols) for _, (cols, _) in live)
+    branches = []
+    for i, (cols, tail) in live:
+        sel = ", ".join(["{} AS fk_idx".format(i)] + cols + ["NULL"] * (width - len(cols)))
+        branches.append("(SELECT {}{})".format(sel, tail))
+    cur.execute("\n    UNION ALL\n    ".join(branches))
+
+    for row in cur.fetchall():
+        i = int(row[0])
+        results[i].append(tuple(row[1:1 + len(probes[i][0])]))
+    return results
 
 # ----------------- MAIN -----------------
 def main():
@@ -323,9 +463,10 @@ def main():
     src = load_json_collections(JSON_FILE)
 
     print_header("ROW COUNTS (JSON file vs MySQL)")
+    counts = mysql_counts(TABLES)
     for t in TABLES:
         jrows = src.get(t, [])
-        my = mysql_count(t)
+        my = counts[t]
         mc = len(jrows)
         status = "OK" if mc == my else "MISMATCH"
         print("- {}: JSON={} | MySQL={} -> {}".format(t, mc, my, status))
@@ -362,8 +503,7 @@ def main():
             print("- {}: OK (no duplicates)".format(t))
 
     print_header("FOREIGN KEY COMPLETENESS (MySQL)")
-    for (child, child_cols), (parent, parent_cols) in FK_MAP:
-        orphans = fk_orphans(child, child_cols, parent, parent_cols)
+    for ((child, _), (parent, _)), orphans in zip(FK_MAP, fk_orphans_all(FK_MAP)):
         if orphans:
             print("- {} -> {}: ORPHANS found (up to {}): {}".format(child, parent, ANOMALY_LIMIT, orphans))
         else:
@@ -1,8 +1,14 @@
 #Second Step
 import os
 import base64
+import itertools
+import struct
 import json
 import mysql.connector
+try:
+    import orjson  # faster drop-in for json.loads
+except ImportError:
+    orjson = None
 from typing import List, Dict, Tuple  # Py 3.8 typing
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from dotenv import load_dotenv
@@ -34,34 +40,60 @@ AES = AESGCM(KEY)
 
 # === DB CONNECTION ===
 conn = mysql.connector.connect(**DB_CONFIG)
-cursor = conn.cursor(prepared=True)
+# Plain (non-prepared) cursor: executemany() on a plain INSERT is rewritten
+# by the connector into one multi-row INSERT per batch. A prepared cursor
+# would send every row as its own COM_STMT_EXECUTE round-trip.
+cursor = conn.cursor()
 
 # === CRYPTO HELPERS ===
+# GCM nonces are <random 64-bit per-run prefix><32-bit big-endian counter>:
+# unique per run without a urandom call per field. Nonce reuse under one key
+# breaks GCM, so rotate APP_AES256_KEY_B64 long before prefixes could collide
+# (~2**32 runs) and never encrypt more than 2**32 fields in a single run.
+NONCE_PREFIX = os.urandom(8)
+_nonce_counter = itertools.count()
+
+def next_iv() -> bytes:
+    n = next(_nonce_counter)
+    if n > 0xFFFFFFFF:
+        raise RuntimeError("GCM nonce counter exhausted for this run; rotate the key.")
+    return NONCE_PREFIX + struct.pack(">I", n)
+
 def enc_field(value_str: str, aad: bytes) -> Tuple[bytes, bytes]:
     """
     Encrypt a string with AES-GCM. Returns (ciphertext_with_tag, iv).
     """
     if value_str is None:
         value_str = ""
-    iv = os.urandom(12)  # 96-bit nonce for GCM
+    iv = next_iv()  # 96-bit nonce for GCM
     ct = AES.encrypt(iv, value_str.encode("utf-8"), aad)
     return ct, iv
 
 def aad_takes(rec: Dict) -> bytes:
-    parts = [
-        str(rec.get("ID", "")),
-        str(rec.get("course_id", "")),
-        str(rec.get("sec_id", "")),
-        str(rec.get("semester", "")),
-        str(rec.get("year", "")),
-    ]
-    return "|".join(parts).encode("utf-8")
+    # one f-string instead of five str() calls + join; build_takes_rows requires these keys anyway
+    return f"{rec['ID']}|{rec['course_id']}|{rec['sec_id']}|{rec['semester']}|{rec['year']}".encode("utf-8")
 
 def aad_by_id(rec: Dict) -> bytes:
-    return str(rec.get("ID", "")).encode("utf-8")
+    return f"{rec.get('ID', '')}".encode("utf-8")
 
 # === INSERT HELPER (handles varying column sets) ===
-BATCH_ROWS = 200  # tune: 100–500 is usually safe
+BATCH_ROWS = 2000  # rows per multi-row INSERT; also capped by BATCH_BYTES
+
+# Keep every multi-row INSERT well below the server's packet limit
+cursor.execute("SELECT @@max_allowed_packet")
+BATCH_BYTES = int(cursor.fetchone()[0]) // 2
+
+def row_bytes(vals: Tuple) -> int:
+    """Upper-bound estimate of a row's size in the INSERT text (utf-8 / escaping overhead included)."""
+    n = 0
+    for v in vals:
+        if isinstance(v, str):
+            n += 4 * len(v) + 4
+        elif isinstance(v, bytes):
+            n += 2 * len(v) + 4
+        else:
+            n += 24
+    return n
 
 def insert_many(table, rows):
     if not rows:
@@ -77,16 +109,27 @@ def insert_many(table, rows):
     placeholders = ", ".join(["%s"] * len(all_keys))
     sql = f"INSERT INTO `{table}` ({cols}) VALUES ({placeholders})"
 
-    # batch by row count
-    for i in range(0, len(rows), BATCH_ROWS):
-        chunk = rows[i:i+BATCH_ROWS]
-        vals = [tuple(r.get(k) for k in all_keys) for r in chunk]
-        cursor.executemany(sql, vals)
+    # batch by row count and by estimated statement size
+    chunk, size = [], 0
+    for r in rows:
+        vals = tuple(r.get(k) for k in all_keys)
+        n = row_bytes(vals)
+        if chunk and (len(chunk) >= BATCH_ROWS or size + n > BATCH_BYTES):
+            cursor.executemany(sql, chunk)
+            chunk, size = [], 0
+        chunk.append(vals)
+        size += n
+    if chunk:
+        cursor.executemany(sql, chunk)
 
         
 # === LOAD JSON ===
-with open(JSON_FILE, "r", encoding="utf-8") as f:
-    json_data = json.load(f)
+if orjson is not None:
+    with open(JSON_FILE, "rb") as f:
+        json_data = orjson.loads(f.read())
+else:
+    with open(JSON_FILE, "r", encoding="utf-8") as f:
+        json_data = json.load(f)
 
 # === BUILD ENCRYPTED ROWS ===
 def build_takes_rows(src: List[Dict]) -> List[Dict]:
@@ -116,19 +159,31 @@ def build_enc_rows(src: List[Dict], preserve_keys: set, aad_builder) -> List[Dic
     out = []
     if not src:
         return out
+    enc_cols = {}  # field -> ("<field>_ct", "<field>_iv"), formatted once per column
+    # the ID cast is decided once per table, not re-tested for every preserved key of every row
+    plain_keys = tuple(k for k in preserve_keys if k != "ID")
+    cast_id = "ID" in preserve_keys
     for rec in src:
         row = {}
         # preserved keys (IDs as ints)
-        for k in preserve_keys:
+        if cast_id and "ID" in rec:
+            idv = rec["ID"]
+            row["ID"] = idv if idv is None else int(idv)
+        for k in plain_keys:
             if k in rec:
-                row[k] = int(rec[k]) if k == "ID" and rec[k] is not None else rec[k]
+                row[k] = rec[k]
         aad = aad_builder(rec)
         for k, v in rec.items():
             if k in preserve_keys:
                 continue
-            ct, iv = enc_field("" if v is None else str(v), aad)
-            row["{}_ct".format(k)] = ct
-            row["{}_iv".format(k)] = iv
+            names = enc_cols.get(k)
+            if names is None:
+                names = enc_cols[k] = ("{}_ct".format(k), "{}_iv".format(k))
+            if type(v) is not str:  # JSON strings need no str() round-trip
+                v = "" if v is None else str(v)
+            ct, iv = enc_field(v, aad)
+            row[names[0]] = ct
+            row[names[1]] = iv
         out.append(row)
     return out
 
@@ -1,8 +1,20 @@
 #First Step
+import io
 import json
-from collections import defaultdict, Counter
+import sys
+from collections import Counter
+from functools import lru_cache
 from itertools import combinations
 
+try:
+    import ijson  # incremental parser: tables are profiled record by record
+except ImportError:
+    ijson = None
+try:
+    from orjson import loads as _loads  # used when the document is loaded whole
+except ImportError:
+    _loads = json.loads
+
 FILENAME = "app.json"
 
 TOP_ARRAY_KEYS = [
@@ -23,27 +35,42 @@ def jtype(v):
     if isinstance(v, dict): return "object"
     return type(v).__name__
 
-def merge_type_stats(stats, v):
-    t = jtype(v)
-    stats["types"][t] += 1
-    if v is None:
-        stats["nulls"] += 1
-    if t == "str":
-        stats["max_len"] = max(stats["max_len"], len(v))
-    if t == "array":
-        stats["has_array"] = True
-    if t == "object":
-        stats["has_object"] = True
+# per-field stats are small lists (cheaper to index than dicts in the hot loop);
+# TAGS buffers type names and is folded into the TYPES Counter in bulk.
+# Most columns are type-stable: MONO is the scalar type of the field's first
+# value and MONO_N counts values of exactly that type, which skip tagging.
+TYPES, NULLS, MAX_LEN, HAS_ARRAY, HAS_OBJECT, TAGS, MONO, MONO_N = range(8)
+TAG_FLUSH = 4096  # records between Counter.update() flushes
+MONO_TAGS = {str: "str", int: "int", float: "float", bool: "bool"}
+
+def _new_stats(first):
+    types = Counter()
+    tag = MONO_TAGS.get(type(first))
+    if tag is not None:
+        types[tag] = 0  # reserve first-seen position for most_common() ties
+    return [types, 0, 0, False, False, [], type(first) if tag else None, 0]
+
+def _flush_tags(fields):
+    for s in fields.values():
+        if s[MONO_N]:
+            s[TYPES][MONO_TAGS[s[MONO]]] += s[MONO_N]
+            s[MONO_N] = 0
+        if s[TAGS]:
+            s[TYPES].update(s[TAGS])  # counted in C
+            s[TAGS] = []
 
 def guess_mysql_type(field_stats):
     """Very simple mapping. Tune as needed."""
-    tcounts = field_stats["types"]
+    tcounts = field_stats[TYPES]
     # if it ever appears as object/array, we will split to child table anyway
     # Pick dominant scalar type (ignores null)
-    scalars = {k:v for k,v in tcounts.items() if k in {"bool","int","float","str"}}
-    if not scalars:
+    dom, best = None, 0
+    for t in ("str", "int", "float", "bool"):
+        c = tcounts.get(t, 0)
+        if c > best:
+            dom, best = t, c
+    if dom is None:
         return "JSON"  # fallback
-    dom = max(scalars, key=scalars.get)
     if dom == "bool":
         return "TINYINT(1)"
     if dom == "int":
@@ -51,116 +78,245 @@ def guess_mysql_type(field_stats):
     if dom == "float":
         return "DOUBLE"
     if dom == "str":
-        ml = max(1, field_stats["max_len"])
+        ml = max(1, field_stats[MAX_LEN])
         if ml <= 255: return f"VARCHAR({max(8, ml)})"
         if ml <= 4000: return "TEXT"
         return "LONGTEXT"
     return "TEXT"
 
+@lru_cache(maxsize=4096)  # few distinct raw keys; the result is a pure function of the name
 def normalize_name(name):
-    return name.strip().replace(" ", "_").replace("-", "_")
-
-def is_unique(records, field):
-    seen = set()
-    for r in records:
-        if field not in r or r[field] is None:
-            return False
-        v = r[field]
-        if v in seen:
-            return False
-        seen.add(v)
-    return True
-
-def candidate_pk(records, table_name):
-    # Prefer common id field names
-    for f in POSSIBLE_ID_FIELDS + [f"{table_name}_id", f"{table_name}Id"]:
-        if all(isinstance(r, dict) for r in records) and any(f in r for r in records):
-            if is_unique(records, f):
-                return f, False  # existing field, not surrogate
-    # As a last resort, try single-field uniqueness scan over small tables
-    fields = set()
-    for r in records:
-        fields.update(r.keys())
-        if len(fields) > 50: break  # avoid too wide scans
-    for f in fields:
-        if is_unique(records, f):
-            return f, False
-    # Give up: use surrogate
-    return f"{table_name}_pk", True
+    return sys.intern(name.strip().replace(" ", "_").replace("-", "_"))
 
 # ---------- main analysis ----------
-def analyze_tables(doc):
+class TableProfiler:
     """
-    Returns:
-      tables = {
-        table_name: {
-          "records": [...],
-          "fields": {col: stats},
-          "pk": (name, is_surrogate),
-          "children": { child_table_name: {"path": field_name, "kind": "array"|"object", "samples": [...] } }
-        }
+    Online profile of one top-level table. Records are fed one at a time via
+    observe(); state is O(schema) plus the PK candidates' seen-values.
+    finalize() returns:
+      {
+        "count": n_records,
+        "fields": {col: [types, nulls, max_len, has_array, has_object, ...]},
+        "pk": (name, is_surrogate),
+        "children": { child_table_name: {"path": field_name, "kind": "array"|"object"} }
       }
     """
-    tables = {}
 
+    def __init__(self, name):
+        self.name = name
+        self.count = 0  # all records, including non-object ones
+        self.fields = {}
+        self.children = {}  # child tables by nested field
+        self._names = {}  # raw key -> normalized name; records repeat the same keys
+        # PK detection: a PK must be present and non-null in every record, so
+        # only the first record's keys qualify (preferred id names first, then
+        # record key order). Each candidate keeps the values seen so far and is
+        # dropped as soon as a value is missing, null, nested or repeated.
+        self._pk_cands = None
+        self._pk_seen = None
+
+    def observe(self, r):
+        self.count += 1
+        if self.count % TAG_FLUSH == 0:
+            _flush_tags(self.fields)
+        if not isinstance(r, dict):
+            return
+        fields, children, names, tname = self.fields, self.children, self._names, self.name
+        # one type dispatch per value, on exact JSON types
+        _str, _int, _float, _bool, _list, _dict = str, int, float, bool, list, dict
+        for k, v in r.items():
+            k2 = names.get(k)
+            if k2 is None:
+                k2 = names[k] = normalize_name(k)
+            s = fields.get(k2)
+            if s is None:
+                s = fields[k2] = _new_stats(v)
+            t = type(v)
+            if t is s[MONO]:
+                # monomorphic fast path
+                s[MONO_N] += 1
+                if t is _str and len(v) > s[MAX_LEN]:
+                    s[MAX_LEN] = len(v)
+            elif t is _str:
+                s[TAGS].append("str")
+                if len(v) > s[MAX_LEN]:
+                    s[MAX_LEN] = len(v)
+            elif t is _int:
+                s[TAGS].append("int")
+            elif t is _float:
+                s[TAGS].append("float")
+            elif v is None:
+                s[TAGS].append("null")
+                s[NULLS] += 1
+            elif t is _bool:
+                s[TAGS].append("bool")
+            elif t is _list:
+                s[TAGS].append("array")
+                if not s[HAS_ARRAY]:
+                    s[HAS_ARRAY] = True
+                    children[f"{tname}_{k2}_items"] = {"path": k2, "kind": "array"}
+            elif t is _dict:
+                s[TAGS].append("object")
+                if not s[HAS_OBJECT]:
+                    s[HAS_OBJECT] = True
+                    children[f"{tname}_{k2}"] = {"path": k2, "kind": "object"}
+            else:
+                s[TAGS].append(jtype(v))
+
+        seen = self._pk_seen
+        if seen is None:
+            cands = [f for f in POSSIBLE_ID_FIELDS + [f"{tname}_id", f"{tname}Id"] if f in r]
+            cands += [f for f in r if f not in cands]
+            self._pk_cands = cands
+            # a usable key is never null, nested or of mixed type: only
+            # scalar candidates are tracked, and each must keep its first type
+            seen = self._pk_seen = {f: (type(r[f]), set()) for f in cands if type(r[f]) in MONO_TAGS}
+        if seen:
+            dead = []
+            for f, (t, vals) in seen.items():
+                v = r.get(f)
+                if type(v) is not t:  # missing, null, nested or type drift
+                    dead.append(f)
+                    continue
+                # one hash probe: a repeat leaves the set size unchanged
+                n = len(vals)
+                vals.add(v)
+                if len(vals) == n:
+                    dead.append(f)
+            for f in dead:
+                del seen[f]  # frees the candidate's values immediately
+
+    def pk(self):
+        for f in self._pk_cands or ():
+            if f in self._pk_seen:
+                return normalize_name(f), False  # existing field, not surrogate
+        # Give up: use surrogate
+        return f"{self.name}_pk", True
+
+    def finalize(self):
+        _flush_tags(self.fields)
+        return {"count": self.count, "fields": self.fields, "pk": self.pk(), "children": self.children}
+
+def profile_stream(f):
+    """
+    Profile every top-level table in one incremental ijson pass over binary
+    file f. Only the top level of the record being read is held in memory.
+    """
+    events = ijson.parse(f, use_float=True)
+    _, event, _ = next(events)
+    if event == "start_map":
+        array_keys = set(TOP_ARRAY_KEYS)
+        current = None  # top-level key whose array is being read
+    elif event == "start_array":
+        # assume the top-level list itself is the main table (unnamed)
+        array_keys = set()
+        current = ""
+    else:
+        raise ValueError("Unsupported JSON shape")
+
+    profilers = {}
+    item_prefix = "item" if current == "" else None
+    prof = TableProfiler("root") if current == "" else None
+    if prof is not None:
+        profilers["root"] = prof
+    # records are built one level deep only; nested arrays/objects are
+    # recorded as empty placeholders and their tokens skipped (the profiler
+    # only needs their kind), so no nested value is ever materialized
+    rec, key, skip = None, None, 0
+    for prefix, event, value in events:
+        if skip:
+            if event == "start_map" or event == "start_array":
+                skip += 1
+            elif event == "end_map" or event == "end_array":
+                skip -= 1
+        elif rec is not None:
+            if event == "map_key":
+                key = value
+            elif event == "end_map":
+                prof.observe(rec)
+                rec = None
+            elif event == "start_map":
+                rec[key], skip = {}, 1
+            elif event == "start_array":
+                rec[key], skip = [], 1
+            else:
+                rec[key] = value
+        elif prefix == item_prefix:
+            if event == "start_map":
+                rec = {}
+            elif event == "start_array":
+                prof.observe([])  # array record: counted, contents skipped
+                skip = 1
+            else:
+                prof.observe(value)  # scalar record
+        elif event == "start_array" and prefix in array_keys:
+            tname = normalize_name(prefix)
+            prof = profilers[tname] = TableProfiler(tname)
+            current, item_prefix = prefix, prefix + ".item"
+        elif event == "end_array" and prefix == current:
+            current, item_prefix = None, None
+
+    # report in TOP_ARRAY_KEYS order, like the whole-document path
+    order = {normalize_name(k): i for i, k in enumerate(TOP_ARRAY_KEYS)}
+    return dict(sorted(profilers.items(), key=lambda kv: order.get(kv[0], -1)))
+
+def profile_doc(doc):
+    """Profile an already-loaded document (used when ijson is not installed)."""
+    profilers = {}
     if isinstance(doc, dict):
         for key in TOP_ARRAY_KEYS:
             if isinstance(doc.get(key), list):
                 tname = normalize_name(key)
-                tables[tname] = {"records": doc[key]}
+                profilers[tname] = TableProfiler(tname)
+                for r in doc[key]:
+                    profilers[tname].observe(r)
     elif isinstance(doc, list):
         # assume the top-level list itself is the main table (unnamed)
-        tables["root"] = {"records": doc}
+        profilers["root"] = TableProfiler("root")
+        for r in doc:
+            profilers["root"].observe(r)
     else:
         raise ValueError("Unsupported JSON shape")
+    return profilers
 
-    # profile fields
-    for tname, tinfo in tables.items():
-        recs = [r for r in tinfo["records"] if isinstance(r, dict)]
-        fields = defaultdict(lambda: {"types": Counter(), "nulls": 0, "max_len": 0, "has_array": False, "has_object": False})
-        children = {}  # child tables by nested field
-        for r in recs:
-            for k, v in r.items():
-                k2 = normalize_name(k)
-                merge_type_stats(fields[k2], v)
-                if jtype(v) == "array":
-                    children[f"{tname}_{k2}_items"] = {"path": k2, "kind": "array"}
-                elif jtype(v) == "object":
-                    children[f"{tname}_{k2}"] = {"path": k2, "kind": "object"}
-
-        # detect PK
-        pk_name, is_sur = candidate_pk(recs, tname)
-
-        tinfo["fields"] = fields
-        tinfo["pk"] = (normalize_name(pk_name), is_sur)
-        tinfo["children"] = children
-
-    return tables
+def analyze_file(path):
+    profilers = None
+    if ijson is not None:
+        try:
+            with open(path, "rb") as f:
+                profilers = profile_stream(f)
+        except ijson.IncompleteJSONError:
+            pass  # the C backend overflows on integers >= 2**63: profile the loaded document
+    if profilers is None:
+        # bytes straight to the parser: no separate utf-8 decode pass
+        with open(path, "rb") as f:
+            profilers = profile_doc(_loads(f.read()))
+    return {tname: p.finalize() for tname, p in profilers.items()}
 
 
 
 # ---------- run ----------
 def main():
-    with open(FILENAME, "r", encoding="utf-8") as f:
-        doc = json.load(f)
-
-    tables = analyze_tables(doc)
+    tables = analyze_file(FILENAME)
 
-    # Report summary
-    print(f"Detected {len(tables)} top-level table(s): {', '.join(tables.keys())}")
+    # Report summary: built in memory, written once
+    buf = io.StringIO()
+    w = buf.write
+    w(f"Detected {len(tables)} top-level table(s): {', '.join(tables.keys())}\n")
     for tname, tinfo in tables.items():
         pk, is_sur = tinfo["pk"]
-        print(f"\n=== TABLE: {tname} ===")
-        print(f"Records: {len(tinfo['records'])}")
-        print(f"PK: {pk} ({'surrogate' if is_sur else 'from data'})")
-        print("Columns:")
+        w(f"\n=== TABLE: {tname} ===\n")
+        w(f"Records: {tinfo['count']}\n")
+        w(f"PK: {pk} ({'surrogate' if is_sur else 'from data'})\n")
+        w("Columns:\n")
         for col, stats in sorted(tinfo["fields"].items()):
-            tdesc = ", ".join(f"{k}:{v}" for k,v in stats["types"].most_common())
-            print(f"  - {col}: {tdesc}, nulls={stats['nulls']}, max_str_len={stats['max_len']}, nested_array={stats['has_array']}, nested_object={stats['has_object']}")
+            tdesc = ", ".join(f"{k}:{v}" for k,v in stats[TYPES].most_common())
+            w(f"  - {col}: {tdesc}, nulls={stats[NULLS]}, max_str_len={stats[MAX_LEN]}, nested_array={stats[HAS_ARRAY]}, nested_object={stats[HAS_OBJECT]}\n")
         if tinfo["children"]:
-            print("Nested -> child tables:")
+            w("Nested -> child tables:\n")
             for cname, meta in tinfo["children"].items():
-                print(f"  * {cname}  (from field '{meta['path']}', kind={meta['kind']})")
+                w(f"  * {cname}  (from field '{meta['path']}', kind={meta['kind']})\n")
+    sys.stdout.write(buf.getvalue())
 
 if __name__ == "__main__":
     main()